@@ -0,0 +1,92 @@
+"""
+Compiled kernels for the autoscaler v2 resource scheduler.
+
+The kernels are compiled with numba when it's installed, and fall back to the
+equivalent numpy implementation otherwise.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _try_fit_py(
+    available: np.ndarray, demands: np.ndarray, counts: np.ndarray
+) -> np.ndarray:
+    placed = np.zeros(demands.shape[0], dtype=np.int64)
+    for i in range(demands.shape[0]):
+        demand = demands[i]
+        requested = demand > 0
+        if requested.any():
+            num = min(
+                int(counts[i]), int(np.min(available[requested] / demand[requested]))
+            )
+        else:
+            num = int(counts[i])
+        # Guard against rounding errors of the division above. Only the requested
+        # resources are checked, e.g. a node might report a negative amount of
+        # other resources.
+        while num > 0 and np.any(available[requested] - num * demand[requested] < 0):
+            num -= 1
+        if num > 0:
+            available -= num * demand
+            placed[i] = num
+    return placed
+
+
+def _try_fit_nb(
+    available: np.ndarray, demands: np.ndarray, counts: np.ndarray
+) -> np.ndarray:
+    placed = np.zeros(demands.shape[0], dtype=np.int64)
+    for i in range(demands.shape[0]):
+        num = counts[i]
+        for j in range(demands.shape[1]):
+            if demands[i, j] > 0:
+                num = min(num, np.int64(available[j] / demands[i, j]))
+        # Guard against rounding errors of the division above.
+        while num > 0:
+            fits = True
+            for j in range(demands.shape[1]):
+                if demands[i, j] > 0 and available[j] - num * demands[i, j] < 0:
+                    fits = False
+                    break
+            if fits:
+                break
+            num -= 1
+        if num <= 0:
+            continue
+        for j in range(demands.shape[1]):
+            available[j] -= num * demands[i, j]
+        placed[i] = num
+    return placed
+
+
+if numba is not None:
+    _try_fit_nb = numba.njit(cache=True)(_try_fit_nb)
+
+
+def try_fit(
+    available: np.ndarray, demands: np.ndarray, counts: np.ndarray
+) -> np.ndarray:
+    """
+    Fit as many copies of each resource demand as possible onto the available
+    resources, one demand after another in order, without backtracking. Only the
+    resources requested by a demand are checked, as in the v1 scheduler.
+
+    Args:
+        available: The available resources of a node, of shape (num_resources,).
+            It's updated in place with the demands that fit.
+        demands: The distinct resource demands, of shape
+            (num_demands, num_resources).
+        counts: The number of copies requested for each demand, of shape
+            (num_demands,).
+
+    Returns:
+        An int64 array of shape (num_demands,) with the number of copies of each
+        demand that fit.
+    """
+    if numba is None:
+        return _try_fit_py(available, demands, counts)
+    return _try_fit_nb(available, demands, counts)
@@ -140,23 +140,54 @@ class Reconciler:
             ray_install_errors: The errors from RayInstaller.
 
         """
+        # Index the external states once so that the handlers below could look
+        # them up by id.
+        ray_nodes_by_cloud_instance_id: Dict[CloudInstanceId, NodeState] = {}
+        for n in ray_nodes:
+            if n.instance_id:
+                ray_nodes_by_cloud_instance_id[n.instance_id] = n
+            else:
+                # This should only happen to a ray node that's not managed by us.
+                logger.warning(
+                    f"Ray node {n.node_id.decode()} has no instance id. "
+                    "This only happens to a ray node that's not managed by autoscaler. "
+                    "If not, please file a bug at https://github.com/ray-project/ray"
+                )
+
+        launch_errors_by_request_id: Dict[str, LaunchNodeError] = {}
+        termination_errors_by_cloud_instance_id: Dict[
+            CloudInstanceId, TerminateNodeError
+        ] = {}
+        for error in cloud_provider_errors:
+            if isinstance(error, LaunchNodeError):
+                launch_errors_by_request_id[error.request_id] = error
+            elif isinstance(error, TerminateNodeError):
+                termination_errors_by_cloud_instance_id[error.cloud_instance_id] = error
+
+        install_errors_by_instance_id: Dict[str, RayInstallError] = {
+            error.im_instance_id: error for error in ray_install_errors
+        }
 
         # Handle 1 & 2 for cloud instance allocation.
         Reconciler._handle_cloud_instance_allocation(
             instance_manager,
             non_terminated_cloud_instances,
-            cloud_provider_errors,
+            launch_errors_by_request_id,
         )
         Reconciler._handle_cloud_instance_terminated(
             instance_manager, non_terminated_cloud_instances
         )
-        Reconciler._handle_ray_status_transition(instance_manager, ray_nodes)
+        Reconciler._handle_ray_status_transition(
+            instance_manager, ray_nodes_by_cloud_instance_id
+        )
 
         Reconciler._handle_cloud_instance_termination_errors(
-            instance_manager, cloud_provider_errors
+            instance_manager, termination_errors_by_cloud_instance_id
         )
 
-        Reconciler._handle_ray_install_failed(instance_manager, ray_install_errors)
+        Reconciler._handle_ray_install_failed(
+            instance_manager, install_errors_by_instance_id
+        )
 
     @staticmethod
     def _step_next(
@@ -208,7 +239,7 @@ class Reconciler:
     def _handle_cloud_instance_allocation(
         instance_manager: InstanceManager,
         non_terminated_cloud_instances: Dict[CloudInstanceId, CloudInstance],
-        cloud_provider_errors: List[CloudInstanceProviderError],
+        launch_errors: Dict[str, LaunchNodeError],
     ):
         im_instances, version = Reconciler._get_im_instances(instance_manager)
         updates = {}
@@ -220,11 +251,6 @@ class Reconciler:
         assigned_cloud_instance_ids: Set[CloudInstanceId] = {
             instance.cloud_instance_id for instance in im_instances
         }
-        launch_errors: Dict[str, LaunchNodeError] = {
-            error.request_id: error
-            for error in cloud_provider_errors
-            if isinstance(error, LaunchNodeError)
-        }
         unassigned_cloud_instances_by_type: Dict[
             str, List[CloudInstance]
         ] = defaultdict(list)
@@ -316,7 +342,8 @@ class Reconciler:
 
     @staticmethod
     def _handle_ray_install_failed(
-        instance_manager: InstanceManager, ray_install_errors: List[RayInstallError]
+        instance_manager: InstanceManager,
+        install_errors: Dict[str, RayInstallError],
     ):
 
         instances, version = Reconciler._get_im_instances(instance_manager)
@@ -329,8 +356,6 @@ class Reconciler:
             if instance.status == IMInstance.RAY_INSTALLING
         }
 
-        install_errors = {error.im_instance_id: error for error in ray_install_errors}
-
         # For each instance with RAY_INSTALLING status, check if there's any
         # install error.
         for instance_id, instance in instances_with_ray_installing.items():
@@ -403,7 +428,7 @@ class Reconciler:
     @staticmethod
     def _handle_cloud_instance_termination_errors(
         instance_manager: InstanceManager,
-        cloud_provider_errors: List[CloudInstanceProviderError],
+        termination_errors: Dict[CloudInstanceId, TerminateNodeError],
     ):
         """
         If any TERMINATING instances have termination errors, transition the instance to
@@ -414,18 +439,13 @@ class Reconciler:
 
         Args:
             instance_manager: The instance manager to reconcile.
-            cloud_provider_errors: The errors from the cloud provider.
+            termination_errors: The termination errors from the cloud provider,
+                by cloud instance id.
 
         """
         instances, version = Reconciler._get_im_instances(instance_manager)
         updates = {}
 
-        termination_errors = {
-            error.cloud_instance_id: error
-            for error in cloud_provider_errors
-            if isinstance(error, TerminateNodeError)
-        }
-
         terminating_instances_by_cloud_instance_id = {
             instance.cloud_instance_id: instance
             for instance in instances
@@ -493,7 +513,8 @@ class Reconciler:
 
     @staticmethod
     def _handle_ray_status_transition(
-        instance_manager: InstanceManager, ray_nodes: List[NodeState]
+        instance_manager: InstanceManager,
+        ray_nodes_by_cloud_instance_id: Dict[CloudInstanceId, NodeState],
     ):
         """
         Handle the ray status transition for the instance manager.
@@ -504,7 +525,8 @@ class Reconciler:
 
         Args:
             instance_manager: The instance manager to reconcile.
-            ray_nodes: The ray cluster's states of ray nodes.
+            ray_nodes_by_cloud_instance_id: The ray cluster's states of ray nodes,
+                by the cloud instance id they run on.
         """
         instances, version = Reconciler._get_im_instances(instance_manager)
         updates = {}
@@ -512,17 +534,6 @@ class Reconciler:
         im_instances_by_cloud_instance_id = {
             i.cloud_instance_id: i for i in instances if i.cloud_instance_id
         }
-        ray_nodes_by_cloud_instance_id = {}
-        for n in ray_nodes:
-            if n.instance_id:
-                ray_nodes_by_cloud_instance_id[n.instance_id] = n
-            else:
-                # This should only happen to a ray node that's not managed by us.
-                logger.warning(
-                    f"Ray node {n.node_id.decode()} has no instance id. "
-                    "This only happens to a ray node that's not managed by autoscaler. "
-                    "If not, please file a bug at https://github.com/ray-project/ray"
-                )
 
         for cloud_instance_id, ray_node in ray_nodes_by_cloud_instance_id.items():
             if cloud_instance_id not in im_instances_by_cloud_instance_id:
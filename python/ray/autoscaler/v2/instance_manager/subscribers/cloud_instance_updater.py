@@ -1,6 +1,6 @@
 import logging
 import uuid
-from collections import defaultdict
+from collections import Counter, defaultdict
 from typing import List
 
 from ray.autoscaler.v2.instance_manager.instance_storage import (
@@ -84,9 +84,7 @@ class CloudInstanceUpdater(InstanceUpdatedSubscriber):
             requests_by_launch_request_id[event.launch_request_id].append(event)
 
         for launch_request_id, events in requests_by_launch_request_id.items():
-            request_shape = defaultdict(int)
-            for event in events:
-                request_shape[event.instance_type] += 1
+            request_shape = Counter(event.instance_type for event in events)
             # Make requests to the cloud provider.
             self._cloud_provider.launch(
                 shape=request_shape, request_id=launch_request_id
@@ -1,11 +1,13 @@
-import copy
+import dataclasses
+import heapq
+import itertools
 import logging
 import time
 from abc import ABC, abstractmethod
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
 from dataclasses import dataclass, field
-from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from enum import IntEnum
+from typing import Deque, Dict, List, Mapping, Optional, Tuple
 
 from google.protobuf.json_format import MessageToDict
 
@@ -13,14 +15,27 @@ from ray.autoscaler._private.resource_demand_scheduler import UtilizationScore
 from ray.autoscaler.v2.instance_manager.common import InstanceUtil
 from ray.autoscaler.v2.instance_manager.config import NodeTypeConfig
 from ray.autoscaler.v2.schema import AutoscalerInstance, NodeType
-from ray.autoscaler.v2.utils import resource_requests_by_count
 from ray.core.generated.autoscaler_pb2 import (
     ClusterResourceConstraint,
     GangResourceRequest,
     ResourceRequest,
     ResourceRequestByCount,
 )
-from ray.core.generated.instance_manager_pb2 import LaunchRequest, TerminationRequest
+from ray.core.generated.instance_manager_pb2 import (
+    Instance,
+    LaunchRequest,
+    TerminationRequest,
+)
+
+try:
+    import numpy as np
+
+    from ray.autoscaler.v2._scheduler_kernel import try_fit
+except ImportError:
+    # numpy is not installed with the minimal installation of ray. It's only
+    # needed by the `ResourceDemandScheduler`, so that the scheduler interfaces
+    # could still be imported, e.g. by the reconciler.
+    np = None
 
 # ============= Resource Scheduling Service API =======================
 #
@@ -31,12 +46,20 @@ from ray.core.generated.instance_manager_pb2 import LaunchRequest, TerminationRe
 #
 logger = logging.getLogger(__name__)
 
+# The instance statuses from which an instance may transition to RAY_RUNNING, i.e.
+# the instance is pending to run ray.
+_RAY_RUNNING_REACHABLE_STATUSES = frozenset(
+    status
+    for status in Instance.InstanceStatus.values()
+    if InstanceUtil.is_ray_running_reachable(status)
+)
+
 
 @dataclass
 class SchedulingRequest:
     # Available node type configs
     node_type_configs: Dict[NodeType, NodeTypeConfig] = field(default_factory=dict)
-    # Max number of worker nodes.
+    # Max number of worker nodes. None or 0 for no limit.
     max_num_nodes: Optional[int] = None
     # TODO: This prob could be refactored into the ClusterStatus data class later.
     # The current ray resource requests.
@@ -88,21 +111,138 @@ class IResourceScheduler(ABC):
         pass
 
 
-class SchedulingNodeStatus(Enum):
+class SchedulingNodeStatus(IntEnum):
     """
     The status of a scheduling node (`SchedulingNode`)
+
+    The statuses are ints so that they are compared as ints; use the `name` of a
+    status for logging.
     """
 
     # The node is to be launched.
-    TO_LAUNCH = "TO_LAUNCH"
+    TO_LAUNCH = 1
     # The node is pending, i.e. there's already an autoscaler instance being launched
-    PENDING = "PENDING"
+    PENDING = 2
     # The node is running.
-    RUNNING = "RUNNING"
+    RUNNING = 3
     # The node is to be terminated.
-    TO_TERMINATE = "TO_TERMINATE"
+    TO_TERMINATE = 4
+
+
+# Mapping from a resource name to its index in the per-node resource arrays.
+ResourceIndex = Dict[str, int]
+
+
+def _add_slots(cls: type) -> type:
+    """
+    Recreate a dataclass with `__slots__` for its fields, i.e. what
+    `dataclass(slots=True)` does on python 3.10+.
+
+    This avoids the per instance `__dict__` for classes that are instantiated
+    many times, e.g. for each node of the cluster.
+    """
+    field_names = tuple(f.name for f in dataclasses.fields(cls))
+    cls_dict = dict(cls.__dict__)
+    cls_dict["__slots__"] = field_names
+    cls_dict["__qualname__"] = cls.__qualname__
+    for name in field_names:
+        # Remove the default values which would conflict with the slots. The
+        # dataclass generated `__init__` has its own references to them.
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
+def _to_resource_array(
+    resources: Mapping[str, float], resource_index: ResourceIndex
+) -> "np.ndarray":
+    """
+    Convert a resource map into a dense resource array.
 
+    Args:
+        resources: The resource map, e.g. {"CPU": 1, "GPU": 2}.
+        resource_index: The resource index of the schedule context. All the
+            resources in `resources` are expected to be in the index.
 
+    Returns:
+        A float64 array where the i-th element is the amount of resource i.
+    """
+    arr = np.zeros(len(resource_index), dtype=np.float64)
+    for name, value in resources.items():
+        arr[resource_index[name]] = value
+    return arr
+
+
+def _sort_resource_request(req: ResourceRequest) -> Tuple:
+    """
+    The sort key for resource requests: requests with more placement constraints,
+    more resource types, and larger resource amounts are scheduled first.
+    """
+    return (
+        len(req.placement_constraints),
+        len(req.resources_bundle),
+        sum(req.resources_bundle.values()),
+        sorted(req.resources_bundle.items()),
+    )
+
+
+def _combine_requests_with_affinity(
+    requests: List[ResourceRequest], counts: List[int]
+) -> Tuple[List[ResourceRequest], List[int], List[Optional[List[int]]]]:
+    """
+    Combine all the copies of the requests with the same affinity constraint into
+    a single request, since they have to be placed on the same node.
+
+    Args:
+        requests: The resource requests.
+        counts: The number of copies of each request.
+
+    Returns:
+        A tuple of:
+            - the requests, where the ones with affinity constraints are combined.
+            - the number of copies of each of them.
+            - for each of them, the indices of the input requests it's combined
+            from, or None if it's an input request as is.
+    """
+    combined_requests: List[ResourceRequest] = []
+    combined_counts: List[int] = []
+    combined_from: List[Optional[List[int]]] = []
+    idx_by_affinity: Dict[Tuple[str, str], int] = {}
+    for i, (request, count) in enumerate(zip(requests, counts)):
+        affinity = next(
+            (
+                constraint.affinity
+                for constraint in request.placement_constraints
+                if constraint.HasField("affinity")
+            ),
+            None,
+        )
+        if affinity is None:
+            combined_requests.append(request)
+            combined_counts.append(count)
+            combined_from.append(None)
+            continue
+
+        key = (affinity.label_name, affinity.label_value)
+        if key not in idx_by_affinity:
+            idx_by_affinity[key] = len(combined_requests)
+            combined_requests.append(ResourceRequest())
+            combined_counts.append(1)
+            combined_from.append([])
+        idx = idx_by_affinity[key]
+        combined = combined_requests[idx]
+        for name, value in request.resources_bundle.items():
+            combined.resources_bundle[name] += value * count
+        for constraint in request.placement_constraints:
+            if constraint not in combined.placement_constraints:
+                combined.placement_constraints.append(constraint)
+        combined_from[idx].append(i)
+
+    return combined_requests, combined_counts, combined_from
+
+
+@_add_slots
 @dataclass
 class SchedulingNode:
     """
@@ -110,11 +250,15 @@ class SchedulingNode:
 
     A scheduling node is expected to be used as:
 
-        node  = SchedulingNode.from_node_config(node_config)
-        remaining, score = node.try_schedule(requests)
+        node  = SchedulingNode.from_node_config(node_config, status, resource_index)
+        remaining_counts, score = node.try_schedule(requests, demands, counts)
 
         .... do something with the score ....
 
+    The resources of the node are kept as dense arrays indexed by the
+    `resource_index` shared by all nodes of the same schedule context, such that
+    fitting a request onto a node is a single vectorized comparison.
+
     NOTE:
         One could also extend the scheduling behavior by overriding `try_schedule`
     """
@@ -124,7 +268,9 @@ class SchedulingNode:
         cls,
         node_config: NodeTypeConfig,
         status: SchedulingNodeStatus,
+        resource_index: ResourceIndex,
         im_instance_id: Optional[str] = None,
+        node_resources: Optional["np.ndarray"] = None,
     ) -> "SchedulingNode":
         """
         Create a scheduling node from a node config.
@@ -132,12 +278,19 @@ class SchedulingNode:
         Args:
             node_config: The node config.
             status: The status of the node.
+            resource_index: The resource index of the schedule context.
             im_instance_id: The instance id of the im instance.
+            node_resources: The resource array of the node type if already
+                converted, e.g. cached by the schedule context. It's not modified,
+                and is shared as the node's total resources.
         """
+        if node_resources is None:
+            node_resources = _to_resource_array(node_config.resources, resource_index)
         return cls(
             node_type=node_config.name,
-            total_resources=dict(node_config.resources),
-            available_resources=dict(node_config.resources),
+            total_resources=node_resources,
+            available_resources=node_resources.copy(),
+            resource_index=resource_index,
             labels=dict(node_config.labels),
             status=status,
             im_instance_id=im_instance_id,
@@ -145,12 +298,20 @@ class SchedulingNode:
 
     # Node type name.
     node_type: NodeType
-    # Requests committed to be placed on this node.
-    sched_requests: List[ResourceRequest] = field(default_factory=list)
-    # The node's current resource capacity.
-    total_resources: Dict[str, float] = field(default_factory=dict)
-    # The node's available resources.
-    available_resources: Dict[str, float] = field(default_factory=dict)
+    # Requests committed to be placed on this node, with the number of copies
+    # placed at once.
+    sched_requests: List[Tuple[ResourceRequest, int]] = field(default_factory=list)
+    # The node's current resource capacity, indexed by `resource_index`.
+    # It's never modified in place, and might be shared with other nodes.
+    total_resources: "np.ndarray" = field(
+        default_factory=lambda: np.zeros(0, dtype=np.float64)
+    )
+    # The node's available resources, indexed by `resource_index`.
+    available_resources: "np.ndarray" = field(
+        default_factory=lambda: np.zeros(0, dtype=np.float64)
+    )
+    # The resource index shared by all nodes in the same schedule context.
+    resource_index: ResourceIndex = field(default_factory=dict)
     # Node's labels, including static or dynamic labels.
     labels: Dict[str, str] = field(default_factory=dict)
     # Status
@@ -168,30 +329,126 @@ class SchedulingNode:
     ray_node_id: Optional[str] = None
     # Idle duration in ms. Default not idle.
     idle_duration_ms: int = 0
+    # Below are derived from the total resources at construction for scoring.
+    # Index of the GPU resource, None if no GPU is in the resource index.
+    _gpu_idx: Optional[int] = field(default=None, init=False, compare=False)
+    # If the node has any GPU.
+    _is_gpu_node: bool = field(default=False, init=False, compare=False)
+    # Mask of the resources with positive total capacity.
+    _has_total: Optional["np.ndarray"] = field(default=None, init=False, compare=False)
+    # The positive total capacities, i.e. `total_resources[_has_total]`.
+    _positive_total: Optional["np.ndarray"] = field(
+        default=None, init=False, compare=False
+    )
+
+    def __post_init__(self):
+        self._gpu_idx = self.resource_index.get("GPU")
+        self._is_gpu_node = (
+            self._gpu_idx is not None and self.total_resources[self._gpu_idx] > 0
+        )
+        self._has_total = self.total_resources > 0
+        self._positive_total = self.total_resources[self._has_total]
+
+    def __eq__(self, other: object) -> bool:
+        # Not generated by the dataclass, which would compare the resource arrays
+        # elementwise rather than as a whole.
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        for f in dataclasses.fields(self):
+            if not f.compare:
+                continue
+            value, other_value = getattr(self, f.name), getattr(other, f.name)
+            if isinstance(value, np.ndarray):
+                if not np.array_equal(value, other_value):
+                    return False
+            elif value != other_value:
+                return False
+        return True
 
     def try_schedule(
-        self, requests: List[ResourceRequest]
-    ) -> Tuple[List[ResourceRequest], UtilizationScore]:
+        self,
+        requests: List[ResourceRequest],
+        demands: "np.ndarray",
+        counts: "np.ndarray",
+    ) -> Tuple["np.ndarray", UtilizationScore]:
         """
         Try to schedule the resource requests on this node.
 
         This modifies the node's available resources if the requests are schedulable.
-        When iterating through the requests, the requests are sorted by the
-        `_sort_resource_request` function. The requests are scheduled one by one in
-        the sorted order, and no backtracking is done.
+        The requests are scheduled in the given order, placing as many copies of a
+        request as possible at once, and no backtracking is done.
+
+        A request with anti-affinity constraints is placed at most once on a node,
+        and not on a node with the constraint's label, which is then added to the
+        node's labels. Requests with affinity constraints are expected to be
+        combined with `_combine_requests_with_affinity` by the caller.
 
         Args:
-            requests: The resource requests to be scheduled.
+            requests: The distinct resource requests to be scheduled. The caller is
+                expected to sort them with the `_sort_resource_request` function,
+                such that they are only sorted once for all the nodes.
+            demands: A 2D array of shape (len(requests), len(resource_index)),
+                where the i-th row is the resource demand of requests[i].
+            counts: The number of copies to schedule for each request.
 
         Returns:
             A tuple of:
-                - list of remaining requests that cannot be scheduled on this node.
+                - the number of copies of each request that cannot be scheduled on
+                this node.
                 - the utilization score for this node with respect to the current
                 resource requests being scheduled.
         """
-        pass
+        if any(request.placement_constraints for request in requests):
+            placed = self._try_fit_with_constraints(requests, demands, counts)
+        else:
+            placed = try_fit(self.available_resources, demands, counts)
+        for request, num in zip(requests, placed):
+            if num > 0:
+                self.sched_requests.append((request, int(num)))
+        sched_demand = placed @ demands
+
+        return counts - placed, self._compute_score(sched_demand)
+
+    def _try_fit_with_constraints(
+        self,
+        requests: List[ResourceRequest],
+        demands: "np.ndarray",
+        counts: "np.ndarray",
+    ) -> "np.ndarray":
+        """
+        Fit the requests one by one in the given order, enforcing their
+        anti-affinity constraints against the node's labels.
 
-    def _compute_score(self) -> UtilizationScore:
+        Returns:
+            The number of copies placed for each request.
+        """
+        placed = np.zeros(len(requests), dtype=np.int64)
+        for i, request in enumerate(requests):
+            anti_affinities = [
+                constraint.anti_affinity
+                for constraint in request.placement_constraints
+                if constraint.HasField("anti_affinity")
+            ]
+            count = counts[i]
+            if anti_affinities:
+                if any(
+                    self.labels.get(anti_affinity.label_name)
+                    == anti_affinity.label_value
+                    for anti_affinity in anti_affinities
+                ):
+                    continue
+                count = min(count, 1)
+            placed[i] = try_fit(
+                self.available_resources,
+                demands[i : i + 1],
+                np.array([count], dtype=np.int64),
+            )[0]
+            if placed[i] > 0:
+                for anti_affinity in anti_affinities:
+                    self.labels[anti_affinity.label_name] = anti_affinity.label_value
+        return placed
+
+    def _compute_score(self, sched_demand: "np.ndarray") -> UtilizationScore:
         """
         Compute the utilization score for this node with respect to the current resource
         request being scheduled.
@@ -220,10 +477,51 @@ class SchedulingNode:
 
         TODO(rickyx): add pluggable scoring functions here.
 
+        Args:
+            sched_demand: The aggregated resource demand of the requests being
+                scheduled onto this node.
+
         Returns:
             A utilization score for this node.
         """
-        pass
+        requests_gpu = self._gpu_idx is not None and sched_demand[self._gpu_idx] > 0
+        gpu_ok = int(not (self._is_gpu_node and not requests_gpu))
+
+        num_matching_resource_types = int(
+            np.count_nonzero(self._has_total & (sched_demand > 0))
+        )
+
+        total = self._positive_total
+        if total.size == 0:
+            return (gpu_ok, num_matching_resource_types, 0.0, 0.0)
+
+        util = (total - self.available_resources[self._has_total]) / total
+        return (
+            gpu_ok,
+            num_matching_resource_types,
+            float(util.min()),
+            float(util.mean()),
+        )
+
+    def copy(self) -> "SchedulingNode":
+        """
+        Copy the node. Only the fields mutated during scheduling are copied, while
+        the total resources, the resource index and the protobuf messages are
+        shared.
+        """
+        return dataclasses.replace(
+            self,
+            sched_requests=list(self.sched_requests),
+            available_resources=self.available_resources.copy(),
+            labels=self.labels.copy(),
+        )
+
+    def _as_resource_dict(self, resources: "np.ndarray") -> Dict[str, float]:
+        return {
+            name: float(resources[idx])
+            for name, idx in self.resource_index.items()
+            if resources[idx] != 0
+        }
 
     def __repr__(self) -> str:
         return (
@@ -236,7 +534,7 @@ class SchedulingNode:
             "total_resources={total_resources}, "
             "available_resources={available_resources}, "
             "labels={labels}, launch_reason={launch_reason}), "
-            "sched_requests={sched_requests})"
+            "sched_requests=[{num_sched_requests} reqs])"
         ).format(
             node_type=self.node_type,
             instance_id=self.im_instance_id,
@@ -245,15 +543,162 @@ class SchedulingNode:
             termination_request=str(MessageToDict(self.termination_request))
             if self.termination_request
             else None,
-            status=self.status,
-            total_resources=self.total_resources,
-            available_resources=self.available_resources,
+            status=self.status.name,
+            total_resources=self._as_resource_dict(self.total_resources),
+            available_resources=self._as_resource_dict(self.available_resources),
             labels=self.labels,
             launch_reason=self.launch_reason,
-            sched_requests="|".join(str(MessageToDict(r)) for r in self.sched_requests),
+            num_sched_requests=sum(count for _, count in self.sched_requests),
         )
 
 
+def _try_place(
+    node: SchedulingNode,
+    requests: List[ResourceRequest],
+    demands: "np.ndarray",
+    counts: "np.ndarray",
+) -> Optional[Tuple[SchedulingNode, "np.ndarray", UtilizationScore]]:
+    """
+    Schedule the requests on a copy of the node.
+
+    Args:
+        node: The node, which is not modified.
+        requests: The distinct resource requests.
+        demands: The resource demands of the requests.
+        counts: The number of copies to schedule for each request.
+
+    Returns:
+        None if none of the requests could be placed, otherwise a tuple of:
+            - the copy of the node with the requests placed.
+            - the number of copies of each request placed.
+            - the utilization score of the node.
+    """
+    # Skip the copy if none of the requests fits the node, only checking the
+    # resources requested.
+    demands_left = demands[counts > 0]
+    if not np.any(
+        np.all((node.available_resources >= demands_left) | (demands_left <= 0), axis=1)
+    ):
+        return None
+    node = node.copy()
+    remaining_counts, score = node.try_schedule(requests, demands, counts)
+    placed = counts - remaining_counts
+    if not placed.any():
+        # Nothing placed, e.g. due to the placement constraints.
+        return None
+    return node, placed, score
+
+
+class _PlacementCandidates:
+    """
+    The existing nodes to place the requests on, with their best placement kept
+    up to date as the requests are placed.
+
+    Nodes of the same type with the same available resources and labels, e.g. the
+    pending nodes of a type, yield the same placement and score, so they are
+    grouped into buckets, and only the first node of each bucket is tried.
+
+    The placement of each bucket is kept in a max heap by utilization score.
+    Placing fewer copies of the requests never yields a higher score, so the
+    placements outdated by the copies placed on other nodes are only recomputed
+    when they are popped, as their scores are upper bounds of the actual ones.
+    """
+
+    def __init__(
+        self,
+        nodes: List[SchedulingNode],
+        requests: List[ResourceRequest],
+        demands: "np.ndarray",
+        counts: "np.ndarray",
+    ):
+        """
+        Args:
+            nodes: The nodes to schedule on, which are added with `add`.
+            requests: The distinct resource requests.
+            demands: The resource demands of the requests.
+            counts: The number of copies left to schedule for each request, which
+                is updated in place by the caller as the copies are placed.
+        """
+        self._nodes = nodes
+        self._requests = requests
+        self._demands = demands
+        self._counts = counts
+        # The indices into `nodes` of the nodes in each bucket.
+        self._buckets: Dict[Tuple, Deque[int]] = {}
+        # The placement of the first node of each bucket, with the sequence number
+        # breaking the ties between the same nodes.
+        self._heap: List[Tuple] = []
+        self._seq = itertools.count()
+
+    def add(self, idx: int) -> None:
+        """
+        Add the node at the index of the nodes to the candidates, unless it's to
+        be terminated.
+        """
+        node = self._nodes[idx]
+        if node.status == SchedulingNodeStatus.TO_TERMINATE:
+            return
+        bucket = (
+            node.node_type,
+            node.total_resources.tobytes(),
+            node.available_resources.tobytes(),
+            tuple(sorted(node.labels.items())),
+        )
+        members = self._buckets.get(bucket)
+        if members is not None:
+            members.append(idx)
+            return
+        self._buckets[bucket] = deque([idx])
+        self._push(bucket)
+
+    def _push(self, bucket: Tuple) -> None:
+        idx = self._buckets[bucket][0]
+        placement = _try_place(
+            self._nodes[idx], self._requests, self._demands, self._counts
+        )
+        if placement is None:
+            # The node fits none of the copies left, which only decrease.
+            return
+        node, placed, score = placement
+        heapq.heappush(
+            self._heap,
+            (
+                tuple(-x for x in score),
+                idx,
+                next(self._seq),
+                bucket,
+                node,
+                placed,
+            ),
+        )
+
+    def pop_best(self) -> Optional[Tuple[int, SchedulingNode, "np.ndarray"]]:
+        """
+        Remove the node with the best placement from the candidates.
+
+        Returns:
+            None if none of the requests fits any of the candidates, otherwise a
+            tuple of:
+                - the index of the node.
+                - the copy of the node with the requests placed.
+                - the number of copies of each request placed.
+        """
+        while self._heap:
+            _, idx, _, bucket, node, placed = heapq.heappop(self._heap)
+            if np.any(placed > self._counts):
+                # Outdated by the copies placed on other nodes.
+                self._push(bucket)
+                continue
+            members = self._buckets[bucket]
+            members.popleft()
+            if members:
+                self._push(bucket)
+            else:
+                del self._buckets[bucket]
+            return idx, node, placed
+        return None
+
+
 class ResourceDemandScheduler(IResourceScheduler):
     """
     A "simple" resource scheduler that schedules resource requests based on the
@@ -262,8 +707,18 @@ class ResourceDemandScheduler(IResourceScheduler):
         2. Enforce the cluster resource constraints.
         3. Schedule the gang resource requests.
         4. Schedule the tasks/actor resource requests
+
+    It requires numpy, which is not installed with the minimal installation of ray.
     """
 
+    def __init__(self):
+        if np is None:
+            raise ImportError(
+                "ResourceDemandScheduler requires numpy, please install it with "
+                "`pip install numpy`."
+            )
+
+    @_add_slots
     @dataclass
     class ScheduleContext:
         """
@@ -283,18 +738,41 @@ class ResourceDemandScheduler(IResourceScheduler):
         # number of workers in the config. This takes into account any pending/running
         # nodes.
         _node_type_available: Dict[NodeType, int] = field(default_factory=dict)
+        # The number of nodes by node types, including all the nodes in `_nodes`.
+        _cluster_shape: Counter = field(default_factory=Counter)
+        # The number of nodes to launch by node types.
+        _to_launch_count: Counter = field(default_factory=Counter)
+        # The termination requests of the nodes to be terminated, recorded by
+        # `mark_terminate`.
+        _terminate_requests: List[TerminationRequest] = field(default_factory=list)
+        # The resource index shared by all the nodes and resource demands, built
+        # once from all the resources known to this scheduling request.
+        _resource_index: ResourceIndex = field(default_factory=dict)
+        # The resource arrays of each node type, converted once from the node
+        # type configs.
+        _node_type_resources: Dict[NodeType, "np.ndarray"] = field(default_factory=dict)
 
         def __init__(
             self,
             nodes: List[SchedulingNode],
             node_type_configs: Dict[NodeType, NodeTypeConfig],
+            resource_index: ResourceIndex,
             max_num_nodes: Optional[int] = None,
+            node_type_resources: Optional[Dict[NodeType, "np.ndarray"]] = None,
         ):
-            self._nodes = nodes
             self._node_type_configs = node_type_configs
-            self._node_type_available = self._compute_available_node_types(
-                nodes, node_type_configs
-            )
+            self._terminate_requests = []
+            self.reset(nodes)
+            self._resource_index = resource_index
+            if node_type_resources is None:
+                node_type_resources = {
+                    node_type: _to_resource_array(config.resources, resource_index)
+                    for node_type, config in node_type_configs.items()
+                }
+            # The arrays are shared as the total resources of the nodes of the type.
+            for resources in node_type_resources.values():
+                resources.flags.writeable = False
+            self._node_type_resources = node_type_resources
             self._max_num_nodes = max_num_nodes
 
         @classmethod
@@ -313,6 +791,11 @@ class ResourceDemandScheduler(IResourceScheduler):
 
             nodes = []
             node_type_configs = req.node_type_configs
+            resource_index = cls._build_resource_index(req)
+            node_type_resources = {
+                node_type: _to_resource_array(config.resources, resource_index)
+                for node_type, config in node_type_configs.items()
+            }
 
             # Initialize the scheduling nodes.
             for instance in req.current_instances:
@@ -321,10 +804,13 @@ class ResourceDemandScheduler(IResourceScheduler):
                     nodes.append(
                         SchedulingNode(
                             node_type=instance.ray_node.ray_node_type_name,
-                            total_resources=dict(instance.ray_node.total_resources),
-                            available_resources=dict(
-                                instance.ray_node.available_resources
+                            total_resources=_to_resource_array(
+                                instance.ray_node.total_resources, resource_index
                             ),
+                            available_resources=_to_resource_array(
+                                instance.ray_node.available_resources, resource_index
+                            ),
+                            resource_index=resource_index,
                             labels=dict(instance.ray_node.dynamic_labels),
                             status=SchedulingNodeStatus.RUNNING,
                             im_instance_id=instance.im_instance.instance_id
@@ -336,9 +822,7 @@ class ResourceDemandScheduler(IResourceScheduler):
                     )
                 elif (
                     instance.im_instance is not None
-                    and InstanceUtil.is_ray_running_reachable(
-                        instance.im_instance.status
-                    )
+                    and instance.im_instance.status in _RAY_RUNNING_REACHABLE_STATUSES
                 ):
                     # This is an im instance that's pending to run ray:
                     # e.g. allocated, or being requested, or ray is installing.
@@ -361,7 +845,9 @@ class ResourceDemandScheduler(IResourceScheduler):
                         SchedulingNode.from_node_config(
                             node_config,
                             status=SchedulingNodeStatus.PENDING,
+                            resource_index=resource_index,
                             im_instance_id=instance.im_instance.instance_id,
+                            node_resources=node_type_resources[node_config.name],
                         )
                     )
                 else:
@@ -374,39 +860,67 @@ class ResourceDemandScheduler(IResourceScheduler):
             return cls(
                 nodes=nodes,
                 node_type_configs=node_type_configs,
+                resource_index=resource_index,
                 max_num_nodes=req.max_num_nodes,
+                node_type_resources=node_type_resources,
             )
 
+        @staticmethod
+        def _build_resource_index(req: SchedulingRequest) -> ResourceIndex:
+            """
+            Build the resource index from all the resources known to the scheduling
+            request, i.e. resources of the node type configs, the running ray nodes
+            and the resource demands.
+
+            Args:
+                req: The scheduling request.
+
+            Returns:
+                A map from resource name to its index in the resource arrays.
+            """
+            resource_index: ResourceIndex = {}
+
+            def _add(resources: Mapping[str, float]) -> None:
+                for name in resources:
+                    if name not in resource_index:
+                        resource_index[name] = len(resource_index)
+
+            for node_type_config in req.node_type_configs.values():
+                _add(node_type_config.resources)
+            for instance in req.current_instances:
+                if instance.ray_node is not None:
+                    _add(instance.ray_node.total_resources)
+                    _add(instance.ray_node.available_resources)
+            for request_by_count in req.resource_requests:
+                _add(request_by_count.request.resources_bundle)
+            for gang_request in req.gang_resource_requests:
+                for request in gang_request.requests:
+                    _add(request.resources_bundle)
+            for constraint in req.cluster_resource_constraints:
+                for request_by_count in constraint.min_bundles:
+                    _add(request_by_count.request.resources_bundle)
+
+            return resource_index
+
         @staticmethod
         def _compute_available_node_types(
-            nodes: List[SchedulingNode],
+            cluster_shape: Dict[NodeType, int],
             node_type_configs: Dict[NodeType, NodeTypeConfig],
         ) -> Dict[NodeType, int]:
             """
             Compute the number of nodes by node types available for launching based on
             the max number of workers in the config.
             Args:
-                nodes: The current existing nodes.
+                cluster_shape: The number of existing nodes by node types.
                 node_type_configs: The node type configs.
             Returns:
                 A dict of node types and the number of nodes available for launching.
             """
-            node_type_available: Dict[NodeType, int] = defaultdict(int)
-            node_type_existing: Dict[NodeType, int] = defaultdict(int)
-            for node in nodes:
-                node_type_existing[node.node_type] += 1
-
-            for (
-                node_type,
-                node_type_config,
-            ) in node_type_configs.items():
-                node_type_available[
-                    node_type
-                ] = node_type_config.max_worker_nodes - node_type_existing.get(
-                    node_type, 0
-                )
-
-            return node_type_available
+            return {
+                node_type: node_type_config.max_worker_nodes
+                - cluster_shape.get(node_type, 0)
+                for node_type, node_type_config in node_type_configs.items()
+            }
 
         def get_nodes(self) -> List[SchedulingNode]:
             """
@@ -415,35 +929,116 @@ class ResourceDemandScheduler(IResourceScheduler):
             Returns:
                 A list of nodes.
             """
-            nodes = copy.deepcopy(self._nodes)
-            return nodes
+            return [node.copy() for node in self._nodes]
 
         def get_cluster_shape(self) -> Dict[NodeType, int]:
-            cluster_shape = defaultdict(int)
-            for node in self._nodes:
-                cluster_shape[node.node_type] += 1
-            return cluster_shape
+            return dict(self._cluster_shape)
 
-        def update(self, new_nodes: List[SchedulingNode]) -> None:
-            """
-            Update the context with the new nodes.
+        def reset(self, nodes: List[SchedulingNode]) -> None:
             """
-            self._nodes = new_nodes
+            Reset the context with the new nodes, recomputing the cluster shape, the
+            nodes to launch, and the available node types.
 
-            # Update the available node types.
+            The termination requests are not recomputed, since they are recorded
+            with `mark_terminate` when selecting the nodes to terminate.
+            """
+            self._nodes = nodes
+            self._cluster_shape = Counter(node.node_type for node in nodes)
+            self._to_launch_count = Counter(
+                node.node_type
+                for node in nodes
+                if node.status == SchedulingNodeStatus.TO_LAUNCH
+            )
             self._node_type_available = self._compute_available_node_types(
-                self._nodes, self._node_type_configs
+                self._cluster_shape, self._node_type_configs
             )
 
+        def prepend_nodes(self, nodes: List[SchedulingNode]) -> None:
+            """
+            Add new nodes in front of the existing nodes, updating the cluster shape
+            and the available node types incrementally.
+            """
+            self._nodes[0:0] = nodes
+            for node in nodes:
+                self._cluster_shape[node.node_type] += 1
+                if node.status == SchedulingNodeStatus.TO_LAUNCH:
+                    self._to_launch_count[node.node_type] += 1
+                if node.node_type in self._node_type_available:
+                    self._node_type_available[node.node_type] -= 1
+
+        def mark_terminate(
+            self, node: SchedulingNode, termination_request: TerminationRequest
+        ) -> None:
+            """
+            Mark the node to be terminated, and record its termination request.
+
+            Args:
+                node: The node to terminate, which is expected to be set into the
+                    context with `reset`.
+                termination_request: The termination request for the node.
+            """
+            node.status = SchedulingNodeStatus.TO_TERMINATE
+            node.termination_request = termination_request
+            self._terminate_requests.append(termination_request)
+
         def get_max_num_nodes(self) -> Optional[int]:
             """
-            Get the max number of nodes for the entire cluster.
+            Get the max number of nodes for the entire cluster, where None or 0
+            means no limit.
             """
             return self._max_num_nodes
 
         def get_node_type_configs(self) -> Dict[NodeType, NodeTypeConfig]:
             return self._node_type_configs
 
+        def get_node_type_available(self) -> Dict[NodeType, int]:
+            return self._node_type_available
+
+        def get_resource_index(self) -> ResourceIndex:
+            return self._resource_index
+
+        def get_node_type_resources(self, node_type: NodeType) -> "np.ndarray":
+            """
+            Get the resource array of the node type. The caller should not modify it.
+            """
+            return self._node_type_resources[node_type]
+
+        def get_resource_demands(self, requests: List[ResourceRequest]) -> "np.ndarray":
+            """
+            Get the resource demands of the requests as a 2D array of shape
+            (len(requests), len(resource_index)).
+
+            Args:
+                requests: The resource requests. All the resources requested are
+                    expected to be in the resource index.
+            """
+            demands = np.zeros(
+                (len(requests), len(self._resource_index)), dtype=np.float64
+            )
+            for i, request in enumerate(requests):
+                for name, value in request.resources_bundle.items():
+                    demands[i, self._resource_index[name]] = value
+            return demands
+
+        def get_total_capacity(self) -> "np.ndarray":
+            """
+            Get the total resources of the cluster if all the available node types
+            were launched, i.e. the total resources of the current nodes that are not
+            to be terminated, and of the nodes that could still be launched for each
+            node type.
+
+            It's an upper bound of the resources that could be scheduled, since the
+            global max number of nodes is not considered.
+            """
+            capacity = np.zeros(len(self._resource_index), dtype=np.float64)
+            for node in self._nodes:
+                if node.status != SchedulingNodeStatus.TO_TERMINATE:
+                    capacity += node.total_resources
+            for node_type, num_available in self._node_type_available.items():
+                if num_available > 0:
+                    capacity += self._node_type_resources[node_type] * num_available
+            return capacity
+
         def __str__(self) -> str:
             return "ScheduleContext({} nodes, node_type_available={}): {}".format(
                 len(self._nodes), self._node_type_available, self._nodes
@@ -453,19 +1048,17 @@ class ResourceDemandScheduler(IResourceScheduler):
             """
             Get the launch requests for the nodes that are to be launched.
             """
-            launch_by_type = defaultdict(int)
-            for node in self._nodes:
-                if node.status == SchedulingNodeStatus.TO_LAUNCH:
-                    launch_by_type[node.node_type] += 1
-
+            now_ns = time.time_ns()
+            request_ts_ms = now_ns // 1_000_000
             launch_requests = []
-            for instance_type, count in launch_by_type.items():
+            for i, (instance_type, count) in enumerate(self._to_launch_count.items()):
                 launch_requests.append(
                     LaunchRequest(
                         instance_type=instance_type,
                         count=count,
-                        id=str(time.time_ns()),
-                        request_ts_ms=time.time_ns() // 1000,
+                        # Suffix the index for unique ids within the same timestamp.
+                        id="{}-{}".format(now_ns, i),
+                        request_ts_ms=request_ts_ms,
                     )
                 )
             return launch_requests
@@ -476,15 +1069,18 @@ class ResourceDemandScheduler(IResourceScheduler):
             """
             Get the terminate requests for the nodes that are to be terminated.
             """
-            return [
-                node.termination_request
-                for node in self._nodes
-                if node.termination_request is not None
-            ]
+            return list(self._terminate_requests)
 
     def schedule(self, request: SchedulingRequest) -> SchedulingReply:
         ctx = ResourceDemandScheduler.ScheduleContext.from_schedule_request(request)
 
+        if ResourceDemandScheduler._is_steady_state(ctx, request):
+            # Nothing to launch or terminate.
+            return SchedulingReply(
+                to_launch=ctx.get_launch_requests(),
+                to_terminate=ctx.get_terminate_requests(),
+            )
+
         # Enforce the minimal count of nodes for each worker node type.
         ResourceDemandScheduler._enforce_min_workers_per_type(ctx)
 
@@ -514,9 +1110,7 @@ class ResourceDemandScheduler(IResourceScheduler):
 
         # Compute the number of nodes to launch.
         reply = SchedulingReply(
-            infeasible_resource_requests=resource_requests_by_count(
-                infeasible_requests
-            ),
+            infeasible_resource_requests=infeasible_requests,
             infeasible_gang_resource_requests=infeasible_gang_requests,
             infeasible_cluster_resource_constraints=infeasible_constraints,
             to_launch=ctx.get_launch_requests(),
@@ -525,6 +1119,40 @@ class ResourceDemandScheduler(IResourceScheduler):
 
         return reply
 
+    @staticmethod
+    def _is_steady_state(
+        ctx: "ResourceDemandScheduler.ScheduleContext", request: SchedulingRequest
+    ) -> bool:
+        """
+        Check if the cluster is in a steady state, i.e. there are no resource
+        demands, and the node count of each node type is within its min and max
+        worker nodes, as well as the total node count within the max number of nodes.
+        In this case, none of the scheduling stages would launch or terminate nodes.
+
+        Args:
+            ctx: The schedule context, with none of the nodes to be terminated.
+            request: The scheduling request.
+        """
+        if (
+            request.resource_requests
+            or request.gang_resource_requests
+            or request.cluster_resource_constraints
+        ):
+            return False
+
+        cluster_shape = ctx.get_cluster_shape()
+        node_type_configs = ctx.get_node_type_configs()
+        for node_type, count in cluster_shape.items():
+            node_config = node_type_configs.get(node_type)
+            if node_config is None or count > node_config.max_worker_nodes:
+                return False
+        for node_type, node_config in node_type_configs.items():
+            if cluster_shape.get(node_type, 0) < node_config.min_worker_nodes:
+                return False
+
+        max_num_nodes = ctx.get_max_num_nodes()
+        return not max_num_nodes or sum(cluster_shape.values()) <= max_num_nodes
+
     @staticmethod
     def _enforce_max_workers_per_type(
         ctx: "ResourceDemandScheduler.ScheduleContext",
@@ -561,6 +1189,7 @@ class ResourceDemandScheduler(IResourceScheduler):
                 to_terminate,
                 remained_nodes,
             ) = ResourceDemandScheduler._select_nodes_to_terminate(
+                ctx,
                 non_terminate_nodes_of_type,
                 num_extra_nodes,
                 TerminationRequest.Cause.MAX_NUM_NODE_PER_TYPE,
@@ -579,7 +1208,7 @@ class ResourceDemandScheduler(IResourceScheduler):
             terminating_nodes + non_terminating_nodes
         ), "The number of nodes should be the same after enforcing max nodes per type."
 
-        ctx.update(terminating_nodes + non_terminating_nodes)
+        ctx.reset(terminating_nodes + non_terminating_nodes)
 
         logger.debug(
             f"Enforced max nodes per type: terminating {len(terminating_nodes)} "
@@ -619,6 +1248,7 @@ class ResourceDemandScheduler(IResourceScheduler):
             to_terminate_nodes,
             non_terminating_nodes,
         ) = ResourceDemandScheduler._select_nodes_to_terminate(
+            ctx,
             non_terminating_nodes,
             num_to_terminate,
             TerminationRequest.Cause.MAX_NUM_NODES,
@@ -647,13 +1277,15 @@ class ResourceDemandScheduler(IResourceScheduler):
         ), "The number of nodes should be the same after enforcing max nodes."
 
         all_nodes = terminating_nodes + non_terminating_nodes
-        ctx.update(all_nodes)
-        logger.debug(
-            "After enforced max nodes for global num nodes limit : {}".format(ctx)
-        )
+        ctx.reset(all_nodes)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "After enforced max nodes for global num nodes limit : {}".format(ctx)
+            )
 
     @staticmethod
     def _select_nodes_to_terminate(
+        ctx: "ResourceDemandScheduler.ScheduleContext",
         nodes: List[SchedulingNode],
         num_to_terminate: int,
         cause: TerminationRequest.Cause,
@@ -666,6 +1298,7 @@ class ResourceDemandScheduler(IResourceScheduler):
         from the 'nodes' list.
 
         Args:
+            ctx: The schedule context to record the termination requests.
             nodes: The nodes to be terminated.
             num_to_terminate: The number of nodes to be terminated.
             cause: The cause of the termination.
@@ -693,21 +1326,21 @@ class ResourceDemandScheduler(IResourceScheduler):
         )
 
         for node in terminated_nodes:
-            node.status = SchedulingNodeStatus.TO_TERMINATE
-            node.termination_request = TerminationRequest(
+            termination_request = TerminationRequest(
                 id=str(time.time_ns()),
                 instance_id=node.im_instance_id,
                 ray_node_id=node.ray_node_id,
                 cause=cause,
             )
             if cause == TerminationRequest.Cause.MAX_NUM_NODES:
-                node.termination_request.max_num_nodes = max_num_nodes
+                termination_request.max_num_nodes = max_num_nodes
             elif cause == TerminationRequest.Cause.MAX_NUM_NODE_PER_TYPE:
-                node.termination_request.max_num_nodes_per_type = max_num_nodes_per_type
+                termination_request.max_num_nodes_per_type = max_num_nodes_per_type
             elif cause == TerminationRequest.Cause.IDLE:
-                node.termination_request.idle_duration_ms = idle_duration_ms
+                termination_request.idle_duration_ms = idle_duration_ms
             else:
                 raise ValueError("Unknown termination cause: {}".format(cause))
+            ctx.mark_terminate(node, termination_request)
 
         return terminated_nodes, remained_nodes
 
@@ -728,17 +1361,10 @@ class ResourceDemandScheduler(IResourceScheduler):
         # will be terminated first.
         idle_dur = -1 * node.idle_duration_ms
 
-        utils_per_resources = {}
-        for resource, total in node.total_resources.items():
-            if total <= 0:
-                continue
-            utils_per_resources[resource] = (
-                total - node.available_resources.get(resource, 0)
-            ) / total
-
+        total = node._positive_total
         avg_util = (
-            sum(utils_per_resources.values()) / len(utils_per_resources)
-            if utils_per_resources
+            float(((total - node.available_resources[node._has_total]) / total).mean())
+            if total.size
             else 0
         )
 
@@ -754,7 +1380,8 @@ class ResourceDemandScheduler(IResourceScheduler):
 
         # Count the existing nodes by type
         count_by_node_type = ctx.get_cluster_shape()
-        logger.debug("Enforcing min workers: {}".format(ctx))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Enforcing min workers: {}".format(ctx))
 
         new_nodes = []
         # Launch new nodes to satisfy min count for each node type.
@@ -766,20 +1393,21 @@ class ResourceDemandScheduler(IResourceScheduler):
             min_count = node_type_config.min_worker_nodes
             if cur_count < min_count:
                 new_nodes.extend(
-                    [
-                        SchedulingNode.from_node_config(
-                            copy.deepcopy(node_type_config),
-                            status=SchedulingNodeStatus.TO_LAUNCH,
-                        )
-                    ]
-                    * (min_count - cur_count)
+                    SchedulingNode.from_node_config(
+                        node_type_config,
+                        status=SchedulingNodeStatus.TO_LAUNCH,
+                        resource_index=ctx.get_resource_index(),
+                        node_resources=ctx.get_node_type_resources(node_type),
+                    )
+                    for _ in range(min_count - cur_count)
                 )
         # NOTE: we assume the aggregated number of min workers across all node types
         # should not exceed any globally enforced max_num_nodes
 
-        # Add the new nodes to the existing nodes and update the context.
-        ctx.update(new_nodes + ctx.get_nodes())
-        logger.debug("After enforced min workers: {}".format(ctx))
+        # Add the new nodes to the context.
+        ctx.prepend_nodes(new_nodes)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("After enforced min workers: {}".format(ctx))
 
     @staticmethod
     def _enforce_resource_constraints(
@@ -807,18 +1435,186 @@ class ResourceDemandScheduler(IResourceScheduler):
     def _sched_resource_requests(
         ctx: "ResourceDemandScheduler.ScheduleContext",
         requests_by_count: List[ResourceRequestByCount],
-    ) -> List[ResourceRequest]:
+    ) -> List[ResourceRequestByCount]:
         """
         Schedule the resource requests.
 
+        The requests are scheduled by count without being expanded, i.e. as many
+        copies of a request as possible are placed onto a node at once. The copies
+        of the requests with the same affinity constraint are combined into a
+        single request, and reported as the original requests if infeasible.
+
         Args:
             ctx: The schedule context.
             requests_by_count: The resource requests.
 
         Returns:
-            A list of infeasible resource requests.
+            A list of infeasible resource requests by count.
         """
-        return []
+        # Group the requests of the same shape.
+        count_by_shape: Dict[bytes, int] = defaultdict(int)
+        request_by_shape: Dict[bytes, ResourceRequest] = {}
+        for request_by_count in requests_by_count:
+            if request_by_count.count <= 0:
+                continue
+            shape = request_by_count.request.SerializeToString(deterministic=True)
+            count_by_shape[shape] += request_by_count.count
+            request_by_shape.setdefault(shape, request_by_count.request)
+
+        if not request_by_shape:
+            return []
+
+        shapes = list(request_by_shape)
+        requests, counts, combined_from = _combine_requests_with_affinity(
+            [request_by_shape[shape] for shape in shapes],
+            [count_by_shape[shape] for shape in shapes],
+        )
+
+        # Sort the requests once for all the nodes.
+        order = sorted(
+            range(len(requests)),
+            key=lambda i: _sort_resource_request(requests[i]),
+            reverse=True,
+        )
+        requests = [requests[i] for i in order]
+        counts = np.array([counts[i] for i in order], dtype=np.int64)
+        combined_from = [combined_from[i] for i in order]
+
+        nodes = ctx.get_nodes()
+        node_type_available = dict(ctx.get_node_type_available())
+        remaining, remaining_counts = ResourceDemandScheduler._try_schedule(
+            ctx,
+            nodes,
+            node_type_available,
+            requests,
+            ctx.get_resource_demands(requests),
+            counts,
+            launch_reason="resource requests",
+        )
+        ctx.reset(nodes)
+
+        infeasible_requests = []
+        for i, count in zip(remaining, remaining_counts):
+            members = combined_from[i]
+            if members is None:
+                infeasible_requests.append(
+                    ResourceRequestByCount(request=requests[i], count=int(count))
+                )
+                continue
+            # Report the requests the infeasible combined request is made of.
+            for member in members:
+                shape = shapes[member]
+                infeasible_requests.append(
+                    ResourceRequestByCount(
+                        request=request_by_shape[shape], count=count_by_shape[shape]
+                    )
+                )
+        return infeasible_requests
+
+    @staticmethod
+    def _try_schedule(
+        ctx: "ResourceDemandScheduler.ScheduleContext",
+        nodes: List[SchedulingNode],
+        node_type_available: Dict[NodeType, int],
+        requests: List[ResourceRequest],
+        demands: "np.ndarray",
+        counts: "np.ndarray",
+        launch_reason: str,
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Greedily schedule the requests onto the existing nodes, by repeatedly
+        placing the requests on the existing node with the best utilization score,
+        and only launch new nodes, again picked by the best utilization score, once
+        none of the remaining requests fits any of the existing nodes.
+
+        Args:
+            ctx: The schedule context.
+            nodes: The nodes to schedule on. Nodes placed with requests are replaced
+                in place, and new nodes to be launched are appended.
+            node_type_available: The number of nodes by node types available for
+                launching, which is updated in place when new nodes are launched.
+            requests: The distinct resource requests sorted by
+                `_sort_resource_request`.
+            demands: The resource demands of the requests.
+            counts: The number of copies to schedule for each request.
+            launch_reason: The launch reason for the new nodes.
+
+        Returns:
+            A tuple of:
+                - the indices into `requests` of the requests that could not be
+                (fully) scheduled.
+                - the number of copies of each of them that could not be scheduled.
+        """
+        max_num_nodes = ctx.get_max_num_nodes()
+        # A template node for each node type to be launched, which is never
+        # modified since scheduling always happens on a copy.
+        templates = {
+            node_type: SchedulingNode.from_node_config(
+                node_type_config,
+                status=SchedulingNodeStatus.TO_LAUNCH,
+                resource_index=ctx.get_resource_index(),
+                node_resources=ctx.get_node_type_resources(node_type),
+            )
+            for node_type, node_type_config in ctx.get_node_type_configs().items()
+        }
+
+        # The copies left to schedule, updated in place as they are placed.
+        counts = counts.copy()
+        candidates = _PlacementCandidates(nodes, requests, demands, counts)
+        for i in range(len(nodes)):
+            candidates.add(i)
+        num_existing = sum(
+            node.status != SchedulingNodeStatus.TO_TERMINATE for node in nodes
+        )
+
+        while counts.any():
+            best = candidates.pop_best()
+            if best is not None:
+                idx, node, placed = best
+                nodes[idx] = node
+                counts -= placed
+                candidates.add(idx)
+                continue
+
+            # None of the requests fits the existing nodes, launch new nodes for
+            # one of the node types that could still be launched.
+            if max_num_nodes and num_existing >= max_num_nodes:
+                break
+            best_launch = None
+            best_score = None
+            for node_type, num_available in node_type_available.items():
+                if num_available <= 0 or node_type not in templates:
+                    continue
+                placement = _try_place(templates[node_type], requests, demands, counts)
+                if placement is not None and (
+                    best_score is None or placement[2] > best_score
+                ):
+                    best_launch = placement
+                    best_score = placement[2]
+            if best_launch is None:
+                # None of the remaining requests could be scheduled.
+                break
+
+            # The copies left don't fit the new node, and more new nodes of the
+            # type yield the same placement as long as there are enough copies
+            # left, so launch them at once.
+            node, placed, _ = best_launch
+            num_to_launch = min(
+                int(np.min(counts[placed > 0] // placed[placed > 0])),
+                node_type_available[node.node_type],
+            )
+            if max_num_nodes:
+                num_to_launch = min(num_to_launch, max_num_nodes - num_existing)
+            node.launch_reason = launch_reason
+            node_type_available[node.node_type] -= num_to_launch
+            num_existing += num_to_launch
+            counts -= placed * num_to_launch
+            for i in range(num_to_launch):
+                nodes.append(node if i == 0 else node.copy())
+                candidates.add(len(nodes) - 1)
+
+        remaining = np.flatnonzero(counts)
+        return remaining, counts[remaining]
 
     @staticmethod
     def _sched_gang_resource_requests(
@@ -838,4 +1634,45 @@ class ResourceDemandScheduler(IResourceScheduler):
         Returns:
             A list of infeasible gang resource requests.
         """
-        return []
+        infeasible_gang_requests = []
+        # The cluster capacity doesn't include the resources used by the gangs
+        # already scheduled.
+        capacity = ctx.get_total_capacity() if gang_requests else None
+        for gang_request in gang_requests:
+            # Requests with the same affinity constraint are placed as a whole.
+            requests, _, _ = _combine_requests_with_affinity(
+                list(gang_request.requests), [1] * len(gang_request.requests)
+            )
+            # Sort the requests once for all the nodes.
+            requests.sort(key=_sort_resource_request, reverse=True)
+            if not requests:
+                continue
+
+            # Fast reject the gang if it doesn't fit the whole cluster.
+            demands = ctx.get_resource_demands(requests)
+            gang_demand = demands.sum(axis=0)
+            if np.any(gang_demand > capacity):
+                infeasible_gang_requests.append(gang_request)
+                continue
+
+            # Schedule on a copy of the nodes, such that nothing is committed if
+            # any of the requests could not be scheduled.
+            nodes = ctx.get_nodes()
+            node_type_available = dict(ctx.get_node_type_available())
+            remaining, _ = ResourceDemandScheduler._try_schedule(
+                ctx,
+                nodes,
+                node_type_available,
+                requests,
+                demands,
+                np.ones(len(requests), dtype=np.int64),
+                launch_reason="gang resource request: {}".format(gang_request.details),
+            )
+            if remaining.size:
+                infeasible_gang_requests.append(gang_request)
+                continue
+
+            ctx.reset(nodes)
+            capacity -= gang_demand
+
+        return infeasible_gang_requests
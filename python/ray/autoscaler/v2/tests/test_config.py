@@ -8,6 +8,9 @@ from ray._private.test_utils import get_test_config_path
 from ray.autoscaler import AUTOSCALER_DIR_PATH
 from ray.autoscaler.v2.instance_manager.config import FileConfigReader
 
+_MULTI_NODE_CONFIG_PATH = get_test_config_path("test_multi_node.yaml")
+_COMPLEX_CONFIG_PATH = get_test_config_path("test_ray_complex.yaml")
+
 
 @pytest.mark.parametrize(
     "skip_hash",
@@ -15,7 +18,7 @@ from ray.autoscaler.v2.instance_manager.config import FileConfigReader
 )
 def test_simple(skip_hash):
     config = FileConfigReader(
-        get_test_config_path("test_multi_node.yaml"), skip_content_hash=skip_hash
+        _MULTI_NODE_CONFIG_PATH, skip_content_hash=skip_hash
     ).get_autoscaling_config()
     assert config.get_cloud_node_config("head_node") == {"InstanceType": "m5.large"}
     assert config.get_docker_config("head_node") == {
@@ -27,9 +30,7 @@ def test_simple(skip_hash):
 
 
 def test_complex():
-    config = FileConfigReader(
-        get_test_config_path("test_ray_complex.yaml")
-    ).get_autoscaling_config()
+    config = FileConfigReader(_COMPLEX_CONFIG_PATH).get_autoscaling_config()
     assert config.get_head_setup_commands() == [
         "echo a",
         "echo b",
@@ -120,9 +121,7 @@ def test_multi_provider_instance_type():
 
 
 def test_node_type_configs():
-    config = FileConfigReader(
-        get_test_config_path("test_ray_complex.yaml")
-    ).get_autoscaling_config()
+    config = FileConfigReader(_COMPLEX_CONFIG_PATH).get_autoscaling_config()
 
     node_type_configs = config.get_node_type_configs()
     assert config.get_max_num_worker_nodes() == 10
@@ -158,8 +158,6 @@ while True:
             for usage in status.cluster_resource_usage:
                 if usage.resource_name == "CPU":
                     has_task_usage = usage.used > 0
-            print(status.cluster_resource_usage)
-            print(status.resource_demands.ray_task_actor_demand)
             assert not (has_task_demand and has_task_usage), status
             time.sleep(0.1)
     finally:
@@ -228,7 +226,6 @@ while True:
             has_pg_usage = False
             for usage in status.cluster_resource_usage:
                 has_pg_usage = has_pg_usage or "bundle" in usage.resource_name
-            print(has_pg_demand, has_pg_usage)
             assert not (has_pg_demand and has_pg_usage), status
             time.sleep(0.1)
     finally:
@@ -5,21 +5,24 @@ import unittest
 
 import pytest  # noqa
 
-from ray._private.test_utils import load_test_config
 from ray.autoscaler._private.event_summarizer import EventSummarizer
 from ray.autoscaler._private.node_launcher import BaseNodeLauncher
 from ray.autoscaler._private.node_provider_availability_tracker import (
     NodeProviderAvailabilityTracker,
 )
 from ray.autoscaler.node_launch_exception import NodeLaunchException
-from ray.autoscaler.v2.instance_manager.config import AutoscalingConfig
 from ray.autoscaler.v2.instance_manager.node_provider import NodeProviderAdapter
-from ray.autoscaler.v2.tests.util import FakeCounter
+from ray.autoscaler.v2.tests.util import FakeCounter, load_test_autoscaling_config
 from ray.core.generated.instance_manager_pb2 import Instance
 from ray.tests.autoscaler_test_utils import MockProvider
 
 
 class NodeProviderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The config is only read by the tests, so it's shared among them.
+        cls.config = load_test_autoscaling_config("test_ray_complex.yaml")
+
     def setUp(self):
         self.base_provider = MockProvider()
         self.availability_tracker = NodeProviderAvailabilityTracker()
@@ -29,7 +32,6 @@ class NodeProviderTest(unittest.TestCase):
             EventSummarizer(),
             self.availability_tracker,
         )
-        self.config = AutoscalingConfig(load_test_config("test_ray_complex.yaml"))
         self.node_provider = NodeProviderAdapter(
             self.base_provider, self.node_launcher, self.config
         )
@@ -95,7 +97,12 @@ class NodeProviderTest(unittest.TestCase):
 
 
 if __name__ == "__main__":
+    # Skip the .pytest_cache I/O of the cacheprovider plugin.
     if os.environ.get("PARALLEL_CI"):
-        sys.exit(pytest.main(["-n", "auto", "--boxed", "-vs", __file__]))
+        sys.exit(
+            pytest.main(
+                ["-p", "no:cacheprovider", "-n", "auto", "--boxed", "-vs", __file__]
+            )
+        )
     else:
-        sys.exit(pytest.main(["-sv", __file__]))
+        sys.exit(pytest.main(["-p", "no:cacheprovider", "-sv", __file__]))
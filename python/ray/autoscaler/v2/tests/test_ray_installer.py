@@ -5,10 +5,9 @@ import unittest
 
 import pytest  # noqa
 
-from ray._private.test_utils import load_test_config
 from ray.autoscaler.tags import TAG_RAY_NODE_KIND
-from ray.autoscaler.v2.instance_manager.config import AutoscalingConfig
 from ray.autoscaler.v2.instance_manager.ray_installer import RayInstaller
+from ray.autoscaler.v2.tests.util import load_test_autoscaling_config
 from ray.core.generated.instance_manager_pb2 import Instance
 from ray.tests.autoscaler_test_utils import MockProcessRunner, MockProvider
 
@@ -16,7 +15,7 @@ from ray.tests.autoscaler_test_utils import MockProcessRunner, MockProvider
 class RayInstallerTest(unittest.TestCase):
     def setUp(self):
         self.base_provider = MockProvider()
-        self.config = AutoscalingConfig(load_test_config("test_ray_complex.yaml"))
+        self.config = load_test_autoscaling_config("test_ray_complex.yaml")
         self.runner = MockProcessRunner()
         self.ray_installer = RayInstaller(self.base_provider, self.config, self.runner)
 
@@ -4,20 +4,28 @@ import sys
 # coding: utf-8
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pytest
 
+from ray.autoscaler.v2 import _scheduler_kernel
 from ray.autoscaler.v2.scheduler import (
     NodeTypeConfig,
     ResourceDemandScheduler,
+    SchedulingNode,
+    SchedulingNodeStatus,
     SchedulingReply,
     SchedulingRequest,
 )
 from ray.autoscaler.v2.schema import AutoscalerInstance, NodeType
 from ray.autoscaler.v2.tests.util import make_autoscaler_instance
 from ray.core.generated.autoscaler_pb2 import (
+    AffinityConstraint,
+    AntiAffinityConstraint,
     ClusterResourceConstraint,
     GangResourceRequest,
     NodeState,
+    PlacementConstraint,
+    ResourceRequest,
     ResourceRequestByCount,
 )
 from ray.core.generated.instance_manager_pb2 import Instance, TerminationRequest
@@ -53,6 +61,22 @@ def sched_request(
     )
 
 
+def resource_request(shape: ResourceMap, count: int = 1) -> ResourceRequestByCount:
+    return ResourceRequestByCount(
+        request=ResourceRequest(resources_bundle=shape), count=count
+    )
+
+
+def _infeasible_requests(reply: SchedulingReply) -> List[Tuple[ResourceMap, int]]:
+    return sorted(
+        (
+            (dict(r.request.resources_bundle), r.count)
+            for r in reply.infeasible_resource_requests
+        ),
+        key=lambda x: sorted(x[0].items()),
+    )
+
+
 def _launch_and_terminate(
     reply: SchedulingReply,
 ) -> Tuple[Dict[NodeType, int], List[str]]:
@@ -64,7 +88,7 @@ def _launch_and_terminate(
     return actual_to_launch, actual_to_terminate
 
 
-def test_min_worker_nodes():
+def test_min_worker_nodes(monkeypatch):
     scheduler = ResourceDemandScheduler()
     node_type_configs = {
         "type_1": NodeTypeConfig(
@@ -97,6 +121,8 @@ def test_min_worker_nodes():
     reply = scheduler.schedule(request)
     actual_to_launch, _ = _launch_and_terminate(reply)
     assert sorted(actual_to_launch) == sorted(expected_to_launch)
+    # Launch requests have unique ids.
+    assert len({req.id for req in reply.to_launch}) == len(reply.to_launch)
 
     # With existing ray nodes
     request = sched_request(
@@ -136,6 +162,28 @@ def test_min_worker_nodes():
     actual_to_launch, _ = _launch_and_terminate(reply)
     assert sorted(actual_to_launch) == sorted(expected_to_launch)
 
+    # With min workers already satisfied, the scheduling stages are skipped.
+    def _not_called(*args, **kwargs):
+        raise AssertionError("The cluster is in a steady state.")
+
+    for stage in [
+        "_enforce_min_workers_per_type",
+        "_enforce_max_workers_per_type",
+        "_enforce_max_workers_global",
+        "_sched_gang_resource_requests",
+        "_sched_resource_requests",
+    ]:
+        monkeypatch.setattr(ResourceDemandScheduler, stage, staticmethod(_not_called))
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        instances=[
+            make_autoscaler_instance(ray_node=NodeState(ray_node_type_name=node_type))
+            for node_type in ["type_1", "type_3", "type_3"]
+        ],
+    )
+    reply = scheduler.schedule(request)
+    assert _launch_and_terminate(reply) == ({}, [])
+
 
 def test_max_workers_per_type():
     scheduler = ResourceDemandScheduler()
@@ -387,6 +435,443 @@ def test_max_num_nodes():
     )
 
 
+def test_resource_requests():
+    scheduler = ResourceDemandScheduler()
+    node_type_configs = {
+        "cpu_node": NodeTypeConfig(
+            name="cpu_node",
+            resources={"CPU": 4},
+            min_worker_nodes=0,
+            max_worker_nodes=10,
+        ),
+        "gpu_node": NodeTypeConfig(
+            name="gpu_node",
+            resources={"CPU": 4, "GPU": 1},
+            min_worker_nodes=0,
+            max_worker_nodes=10,
+        ),
+    }
+
+    # CPU only requests should avoid GPU nodes.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[resource_request({"CPU": 1}, count=6)],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 2}
+    assert reply.infeasible_resource_requests == []
+
+    # GPU requests go to GPU nodes, and infeasible requests are reported.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[
+            resource_request({"GPU": 1}, count=2),
+            resource_request({"CPU": 8}),
+            resource_request({"TPU": 1}),
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"gpu_node": 2}
+    assert _infeasible_requests(reply) == [({"CPU": 8}, 1), ({"TPU": 1}, 1)]
+
+    # Existing nodes with available resources are used first.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[resource_request({"CPU": 1}, count=3)],
+        instances=[
+            make_autoscaler_instance(
+                ray_node=NodeState(
+                    ray_node_type_name="cpu_node",
+                    available_resources={"CPU": 2},
+                    total_resources={"CPU": 4},
+                    node_id=b"r1",
+                ),
+            ),
+            make_autoscaler_instance(
+                im_instance=Instance(
+                    instance_type="cpu_node", status=Instance.REQUESTED
+                ),
+            ),
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {}
+    assert reply.infeasible_resource_requests == []
+
+    # Existing nodes are used before launching new nodes, even if a new node
+    # would score better, e.g. an idle GPU node for CPU only requests.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[resource_request({"CPU": 1})],
+        instances=[
+            make_autoscaler_instance(
+                ray_node=NodeState(
+                    ray_node_type_name="gpu_node",
+                    available_resources={"CPU": 4, "GPU": 1},
+                    total_resources={"CPU": 4, "GPU": 1},
+                    node_id=b"r1",
+                ),
+            ),
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {}
+    assert reply.infeasible_resource_requests == []
+
+    # Or running nodes reporting a negative amount of other resources.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[resource_request({"CPU": 1})],
+        instances=[
+            make_autoscaler_instance(
+                ray_node=NodeState(
+                    ray_node_type_name="cpu_node",
+                    available_resources={"CPU": 4, "memory": -1},
+                    total_resources={"CPU": 4, "memory": 1000},
+                    node_id=b"r1",
+                ),
+            ),
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {}
+    assert reply.infeasible_resource_requests == []
+
+    # Or running nodes reporting resources not in the node type configs.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[resource_request({"CPU": 1}, count=12)],
+        instances=[
+            make_autoscaler_instance(
+                ray_node=NodeState(
+                    ray_node_type_name="cpu_node",
+                    available_resources={"CPU": 1, "memory": 1000},
+                    total_resources={"CPU": 4, "memory": 1000},
+                    node_id=str(i).encode(),
+                ),
+            )
+            for i in range(8)
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 1}
+    assert reply.infeasible_resource_requests == []
+
+    # Max nodes limit the number of nodes to launch.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[resource_request({"CPU": 4}, count=3)],
+        max_num_nodes=2,
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 2}
+    assert _infeasible_requests(reply) == [({"CPU": 4}, 1)]
+
+    # Zero max nodes means no limit.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[resource_request({"CPU": 4}, count=3)],
+        max_num_nodes=0,
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 3}
+    assert reply.infeasible_resource_requests == []
+
+    # Requests of the same shape are scheduled by count.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[
+            resource_request({"CPU": 1}, count=500),
+            resource_request({"CPU": 1}, count=500),
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 10, "gpu_node": 10}
+    assert _infeasible_requests(reply) == [({"CPU": 1}, 920)]
+
+    # Copies of a request with an affinity constraint are placed on the same
+    # node, and reported as is if infeasible.
+    pack = PlacementConstraint(
+        affinity=AffinityConstraint(label_name="_PG_1", label_value="")
+    )
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[
+            ResourceRequestByCount(
+                request=ResourceRequest(
+                    resources_bundle={"CPU": 2}, placement_constraints=[pack]
+                ),
+                count=count,
+            )
+            for count in (2, 3)
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {}
+    assert _infeasible_requests(reply) == [({"CPU": 2}, 5)]
+
+
+def test_resource_requests_at_scale(monkeypatch):
+    scheduler = ResourceDemandScheduler()
+    node_type_configs = {
+        "cpu_node": NodeTypeConfig(
+            name="cpu_node",
+            resources={"CPU": 8, "memory": 1000},
+            min_worker_nodes=0,
+            max_worker_nodes=10000,
+        ),
+    }
+    num_tries = 0
+    try_schedule = SchedulingNode.try_schedule
+
+    def _try_schedule(self, *args, **kwargs):
+        nonlocal num_tries
+        num_tries += 1
+        return try_schedule(self, *args, **kwargs)
+
+    monkeypatch.setattr(SchedulingNode, "try_schedule", _try_schedule)
+
+    # Each node is only tried a constant number of times, even if all the nodes
+    # have distinct available resources.
+    num_nodes = 1000
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[resource_request({"CPU": 1}, count=num_nodes)],
+        instances=[
+            make_autoscaler_instance(
+                ray_node=NodeState(
+                    ray_node_type_name="cpu_node",
+                    available_resources={"CPU": 1, "memory": i},
+                    total_resources={"CPU": 8, "memory": 1000},
+                    node_id=str(i).encode(),
+                ),
+            )
+            for i in range(num_nodes)
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {}
+    assert reply.infeasible_resource_requests == []
+    assert num_tries <= 3 * num_nodes
+
+    # Nodes of the same type are launched at once.
+    num_tries = 0
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        resource_requests=[resource_request({"CPU": 8}, count=4000)],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 4000}
+    assert num_tries <= 3
+
+
+def test_gang_resource_requests(monkeypatch):
+    scheduler = ResourceDemandScheduler()
+    node_type_configs = {
+        "cpu_node": NodeTypeConfig(
+            name="cpu_node",
+            resources={"CPU": 4},
+            min_worker_nodes=0,
+            max_worker_nodes=3,
+        ),
+    }
+
+    def gang(
+        *shapes: ResourceMap, constraint: Optional[PlacementConstraint] = None
+    ) -> GangResourceRequest:
+        return GangResourceRequest(
+            requests=[
+                ResourceRequest(
+                    resources_bundle=shape,
+                    placement_constraints=[constraint] if constraint else [],
+                )
+                for shape in shapes
+            ]
+        )
+
+    # The second gang is partially feasible, and shouldn't launch any node.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        gang_resource_requests=[
+            gang({"CPU": 4}, {"CPU": 2}),
+            gang({"CPU": 4}, {"CPU": 4}, {"CPU": 4}),
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 2}
+    assert len(reply.infeasible_gang_resource_requests) == 1
+    assert len(reply.infeasible_gang_resource_requests[0].requests) == 3
+
+    # Gangs exceeding the cluster capacity left by the previous gangs, or
+    # requesting unknown resources, are infeasible without being scheduled.
+    scheduled_gangs = []
+    try_schedule = ResourceDemandScheduler._try_schedule
+
+    def _try_schedule(ctx, nodes, node_type_available, requests, *args, **kwargs):
+        scheduled_gangs.append([dict(r.resources_bundle) for r in requests])
+        return try_schedule(ctx, nodes, node_type_available, requests, *args, **kwargs)
+
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        gang_resource_requests=[
+            gang({"CPU": 4}, {"CPU": 4}),
+            gang({"CPU": 2}, {"CPU": 2}, {"CPU": 2}),
+            gang({"GPU": 1}),
+        ],
+    )
+    with monkeypatch.context() as m:
+        m.setattr(ResourceDemandScheduler, "_try_schedule", staticmethod(_try_schedule))
+        reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 2}
+    assert len(reply.infeasible_gang_resource_requests) == 2
+    assert scheduled_gangs == [[{"CPU": 4}, {"CPU": 4}]]
+
+    # Resource requests are scheduled on the nodes launched for the gangs.
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        gang_resource_requests=[gang({"CPU": 4}, {"CPU": 2})],
+        resource_requests=[resource_request({"CPU": 1}, count=2)],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 2}
+    assert reply.infeasible_gang_resource_requests == []
+    assert reply.infeasible_resource_requests == []
+
+    # Anti-affinity (STRICT_SPREAD) places each request on a different node,
+    # including the running nodes with the label.
+    spread = PlacementConstraint(
+        anti_affinity=AntiAffinityConstraint(label_name="_PG_1", label_value="")
+    )
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        gang_resource_requests=[gang({"CPU": 1}, {"CPU": 1}, constraint=spread)],
+        instances=[
+            make_autoscaler_instance(
+                ray_node=NodeState(
+                    ray_node_type_name="cpu_node",
+                    available_resources={"CPU": 3},
+                    total_resources={"CPU": 4},
+                    node_id=b"r1",
+                    dynamic_labels={"_PG_1": ""},
+                ),
+            ),
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 2}
+    assert reply.infeasible_gang_resource_requests == []
+
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        gang_resource_requests=[
+            gang({"CPU": 1}, {"CPU": 1}, {"CPU": 1}, {"CPU": 1}, constraint=spread)
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {}
+    assert len(reply.infeasible_gang_resource_requests) == 1
+
+    # Affinity (STRICT_PACK) places all the requests on the same node.
+    pack = PlacementConstraint(
+        affinity=AffinityConstraint(label_name="_PG_2", label_value="")
+    )
+    request = sched_request(
+        node_type_configs=node_type_configs,
+        gang_resource_requests=[
+            gang({"CPU": 2}, {"CPU": 2}, constraint=pack),
+            gang({"CPU": 3}, {"CPU": 3}, constraint=pack),
+        ],
+    )
+    reply = scheduler.schedule(request)
+    actual_to_launch, _ = _launch_and_terminate(reply)
+    assert actual_to_launch == {"cpu_node": 1}
+    assert len(reply.infeasible_gang_resource_requests) == 1
+    assert len(reply.infeasible_gang_resource_requests[0].requests) == 2
+
+
+def test_scheduling_node_eq():
+    node = SchedulingNode.from_node_config(
+        NodeTypeConfig(
+            name="cpu_node",
+            resources={"CPU": 4, "memory": 1000},
+            min_worker_nodes=0,
+            max_worker_nodes=1,
+        ),
+        status=SchedulingNodeStatus.TO_LAUNCH,
+        resource_index={"CPU": 0, "memory": 1},
+    )
+    assert node == node.copy()
+    other = node.copy()
+    other.status = SchedulingNodeStatus.RUNNING
+    assert node != other
+    # The resource arrays are compared as a whole.
+    other = node.copy()
+    other.available_resources[0] = 1
+    assert node != other
+
+
+def test_scheduling_node_try_schedule():
+    node = SchedulingNode.from_node_config(
+        NodeTypeConfig(
+            name="cpu_node",
+            resources={"CPU": 1000},
+            min_worker_nodes=0,
+            max_worker_nodes=1,
+        ),
+        status=SchedulingNodeStatus.TO_LAUNCH,
+        resource_index={"CPU": 0},
+    )
+    request = ResourceRequest(resources_bundle={"CPU": 1})
+    remaining, _ = node.try_schedule([request], np.array([[1.0]]), np.array([1500]))
+    assert remaining.tolist() == [500]
+    # The copies placed at once are recorded by count.
+    assert node.sched_requests == [(request, 1000)]
+
+
+@pytest.mark.parametrize("compiled", [True, False])
+def test_try_fit(compiled, monkeypatch):
+    if compiled and _scheduler_kernel.numba is None:
+        pytest.skip("numba is not installed")
+    if not compiled:
+        monkeypatch.setattr(_scheduler_kernel, "numba", None)
+
+    available = np.array([7.0, 1.0])
+    demands = np.array([[2.0, 0.0], [1.0, 1.0], [2.0, 1.0], [1.0, 0.0]])
+    counts = np.array([2, 1, 1, 3])
+    placed = _scheduler_kernel.try_fit(available, demands, counts)
+    assert placed.tolist() == [2, 1, 0, 2]
+    assert available.tolist() == [0.0, 0.0]
+
+    # Fractional resources are not over committed due to rounding errors, e.g.
+    # 0.7 / 0.01 == 70 while 70 * 0.01 > 0.7.
+    available = np.array([0.7])
+    placed = _scheduler_kernel.try_fit(available, np.array([[0.01]]), np.array([100]))
+    assert placed.tolist() == [69]
+    assert available[0] >= 0
+
+    # Only the requested resources are checked.
+    available = np.array([4.0, -1.0])
+    placed = _scheduler_kernel.try_fit(available, np.array([[1.0, 0.0]]), np.array([5]))
+    assert placed.tolist() == [4]
+
+
 if __name__ == "__main__":
     if os.environ.get("PARALLEL_CI"):
         sys.exit(pytest.main(["-n", "auto", "--boxed", "-vs", __file__]))
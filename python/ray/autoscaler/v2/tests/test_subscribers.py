@@ -4,19 +4,34 @@ import sys
 
 import pytest
 
-import mock
-
-from ray._private.test_utils import wait_for_condition
 from ray.autoscaler.v2.instance_manager.subscribers.cloud_instance_updater import (
     CloudInstanceUpdater,
 )
 from ray.core.generated.instance_manager_pb2 import Instance, InstanceUpdateEvent
 
 
+class FakeCloudInstanceProvider:
+    """
+    A cloud instance provider that records the launch and terminate requests.
+    """
+
+    __slots__ = ("launch_calls", "terminate_calls")
+
+    def __init__(self):
+        self.launch_calls = []
+        self.terminate_calls = []
+
+    def launch(self, shape, request_id):
+        self.launch_calls.append((dict(shape), request_id))
+
+    def terminate(self, ids, request_id):
+        self.terminate_calls.append((list(ids), request_id))
+
+
 class TestCloudInstanceUpdater:
     def test_launch_no_op(self):
-        mock_provider = mock.MagicMock()
-        launcher = CloudInstanceUpdater(mock_provider)
+        provider = FakeCloudInstanceProvider()
+        launcher = CloudInstanceUpdater(provider)
         launcher.notify(
             [
                 InstanceUpdateEvent(
@@ -26,11 +41,11 @@ class TestCloudInstanceUpdater:
                 ),
             ]
         )
-        mock_provider.launch.assert_not_called()
+        assert provider.launch_calls == []
 
     def test_launch_new_instances(self):
-        mock_provider = mock.MagicMock()
-        launcher = CloudInstanceUpdater(mock_provider)
+        provider = FakeCloudInstanceProvider()
+        launcher = CloudInstanceUpdater(provider)
         launcher.notify(
             [
                 InstanceUpdateEvent(
@@ -56,20 +71,15 @@ class TestCloudInstanceUpdater:
             ]
         )
 
-        def verify():
-            mock_provider.launch.assert_has_calls(
-                [
-                    mock.call(shape={"type-1": 2}, request_id="1"),
-                    mock.call(shape={"type-1": 1, "type-2": 1}, request_id="2"),
-                ]
-            )
-            return True
-
-        wait_for_condition(verify)
+        # The updater requests the cloud provider synchronously.
+        assert provider.launch_calls == [
+            ({"type-1": 2}, "1"),
+            ({"type-1": 1, "type-2": 1}, "2"),
+        ]
 
     def test_multi_notify(self):
-        mock_provider = mock.MagicMock()
-        launcher = CloudInstanceUpdater(mock_provider)
+        provider = FakeCloudInstanceProvider()
+        launcher = CloudInstanceUpdater(provider)
 
         launcher.notify(
             [
@@ -91,21 +101,14 @@ class TestCloudInstanceUpdater:
             ]
         )
 
-        def verify():
-            assert mock_provider.launch.call_count == 2
-            mock_provider.launch.assert_has_calls(
-                [
-                    mock.call(shape={"type-1": 1}, request_id="1"),
-                    mock.call(shape={"type-1": 1}, request_id="2"),
-                ]
-            )
-            return True
-
-        wait_for_condition(verify)
+        assert provider.launch_calls == [
+            ({"type-1": 1}, "1"),
+            ({"type-1": 1}, "2"),
+        ]
 
     def test_terminate_no_op(self):
-        mock_provider = mock.MagicMock()
-        launcher = CloudInstanceUpdater(mock_provider)
+        provider = FakeCloudInstanceProvider()
+        launcher = CloudInstanceUpdater(provider)
         launcher.notify(
             [
                 InstanceUpdateEvent(
@@ -116,15 +119,11 @@ class TestCloudInstanceUpdater:
             ]
         )
 
-        def verify():
-            mock_provider.terminate.assert_not_called()
-            return True
-
-        wait_for_condition(verify)
+        assert provider.terminate_calls == []
 
     def test_terminate_instances(self):
-        mock_provider = mock.MagicMock()
-        launcher = CloudInstanceUpdater(mock_provider)
+        provider = FakeCloudInstanceProvider()
+        launcher = CloudInstanceUpdater(provider)
         launcher.notify(
             [
                 InstanceUpdateEvent(
@@ -145,13 +144,8 @@ class TestCloudInstanceUpdater:
             ]
         )
 
-        def verify():
-            mock_provider.terminate.assert_called_once_with(
-                ids=["c1", "c2", "c3"], request_id=mock.ANY
-            )
-            return True
-
-        wait_for_condition(verify)
+        assert len(provider.terminate_calls) == 1
+        assert provider.terminate_calls[0][0] == ["c1", "c2", "c3"]
 
 
 if __name__ == "__main__":
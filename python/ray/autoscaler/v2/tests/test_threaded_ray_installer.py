@@ -6,15 +6,14 @@ from unittest.mock import patch
 
 import pytest  # noqa
 
-from ray._private.test_utils import load_test_config
 from ray.autoscaler.tags import TAG_RAY_NODE_KIND
-from ray.autoscaler.v2.instance_manager.config import AutoscalingConfig
 from ray.autoscaler.v2.instance_manager.instance_storage import InstanceStorage
 from ray.autoscaler.v2.instance_manager.ray_installer import RayInstaller
 from ray.autoscaler.v2.instance_manager.storage import InMemoryStorage
 from ray.autoscaler.v2.instance_manager.subscribers.threaded_ray_installer import (
     ThreadedRayInstaller,
 )
+from ray.autoscaler.v2.tests.util import load_test_autoscaling_config
 from ray.core.generated.instance_manager_pb2 import Instance
 from ray.tests.autoscaler_test_utils import MockProcessRunner, MockProvider
 
@@ -22,7 +21,7 @@ from ray.tests.autoscaler_test_utils import MockProcessRunner, MockProvider
 class ThreadedRayInstallerTest(unittest.TestCase):
     def setUp(self):
         self.base_provider = MockProvider()
-        self.config = AutoscalingConfig(load_test_config("test_ray_complex.yaml"))
+        self.config = load_test_autoscaling_config("test_ray_complex.yaml")
         self.runner = MockProcessRunner()
         self.ray_installer = RayInstaller(self.base_provider, self.config, self.runner)
         self.instance_storage = InstanceStorage(
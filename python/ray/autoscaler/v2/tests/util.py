@@ -1,9 +1,12 @@
 import abc
+import functools
 import operator
 from abc import abstractmethod
 from typing import Dict, List, Optional, Tuple
 
 import ray
+from ray._private.test_utils import load_test_config
+from ray.autoscaler.v2.instance_manager.config import AutoscalingConfig
 from ray.autoscaler.v2.schema import AutoscalerInstance, ClusterStatus, ResourceUsage
 from ray.autoscaler.v2.sdk import get_cluster_status
 from ray.core.generated import autoscaler_pb2
@@ -36,6 +39,15 @@ def get_cluster_resource_state(stub) -> autoscaler_pb2.ClusterResourceState:
     return stub.GetClusterResourceState(request).cluster_resource_state
 
 
+@functools.lru_cache(maxsize=None)
+def load_test_autoscaling_config(config_file_name: str) -> AutoscalingConfig:
+    """
+    Loads the autoscaling config of a test config yaml. The config is parsed once
+    and shared by the callers, which should not modify it.
+    """
+    return AutoscalingConfig(load_test_config(config_file_name))
+
+
 class FakeCounter:
     def dec(self, *args, **kwargs):
         pass